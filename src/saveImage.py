@@ -5,8 +5,22 @@ import platform
 from dotenv import load_dotenv
 import os
 import json
+import time
+import argparse
+import tarfile
+import io
+import gzip
+import zlib
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 load_dotenv()
 
 class Db_Interface(ABC):
@@ -79,6 +93,38 @@ class Cmd_interface(ABC):
         # Export all Docker image to each tar file
         pass
 
+    @staticmethod
+    @abstractmethod
+    def import_local_image_tar():
+        # Load all exported tar files back into Docker
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def verify_local_image_tar():
+        # Check that all exported tar files are readable image archives
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def plan(operation: str):
+        # Build the work list of an operation without running it
+        pass
+
+
+class Compress_Interface(ABC):
+    @staticmethod
+    @abstractmethod
+    def compress_file(tar_path: str, method: str):
+        # Compress a tar file block by block and write its block index
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def decompress_file(archive_path: str, output_path: str):
+        # Decompress an archive, in parallel when a block index exists
+        pass
+
 ##############################################################################
 
 class Database(Db_Interface):
@@ -124,6 +170,180 @@ class Database(Db_Interface):
             raise
 
 
+class ChunkStream(io.RawIOBase):
+    # 把按顺序产生的数据块包装成只读文件对象, 供 tarfile 流式读取
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buffer = memoryview(b"")
+        self.offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        # 用 memoryview 和偏移量读取当前块, 每个字节只复制一次
+        while self.offset >= len(self.buffer):
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.buffer = memoryview(chunk)
+            self.offset = 0
+        n = min(len(b), len(self.buffer) - self.offset)
+        b[:n] = self.buffer[self.offset:self.offset + n]
+        self.offset += n
+        return n
+
+
+class Compressor(Compress_Interface):
+
+    SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+    BLOCK_SIZE = 64 * 1024 * 1024
+    # 峰值内存约为 2 * workers * block_size (原始块) 再加上压缩后的副本,
+    # 默认 8 个线程, 64 MB 的块约占 1 GB, 在多核机器上需要显式指定 --workers
+    MAX_DEFAULT_WORKERS = 8
+    # 单个归档损坏时可能抛出的异常
+    ERRORS = (zlib.error, EOFError, ValueError, OSError, RuntimeError, tarfile.TarError) + \
+        ((zstandard.ZstdError,) if zstandard is not None else ())
+
+    @staticmethod
+    def __map_ordered(func, items, workers: int | None):
+        # 按顺序返回结果, 同时最多只有 2*workers 个块在内存中
+        workers = workers or min(os.cpu_count() or 1, Compressor.MAX_DEFAULT_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for item in items:
+                pending.append(pool.submit(func, item))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    @staticmethod
+    def __read_blocks(path: Path, block_size: int):
+        with path.open("rb") as f:
+            while block := f.read(block_size):
+                yield block
+
+    @staticmethod
+    def __compress_block(method: str, level: int):
+        Compressor.check_method(method)
+        if method == "gzip":
+            # 每个块都是一个完整的 gzip member, 拼接后仍是标准 gzip 文件
+            return lambda data: (gzip.compress(data, compresslevel=level, mtime=0), len(data))
+        return lambda data: (zstandard.ZstdCompressor(level=level).compress(data), len(data))
+
+    @staticmethod
+    def __decompress_block(method: str, data: bytes) -> bytes:
+        if method == "gzip":
+            return zlib.decompress(data, wbits=31)
+        if method == "zstd":
+            if zstandard is None:
+                raise RuntimeError("zstd decompression requires the 'zstandard' package")
+            return zstandard.ZstdDecompressor().decompress(data)
+        raise ValueError(f"Unsupported compression method: {method}")
+
+    @staticmethod
+    def check_method(method: str):
+        if method not in Compressor.SUFFIXES:
+            raise ValueError(f"Unsupported compression method: {method}")
+        if method == "zstd" and zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+
+    @staticmethod
+    def method_of(path: str | Path) -> str | None:
+        suffix = Path(path).suffix
+        for method, method_suffix in Compressor.SUFFIXES.items():
+            if suffix == method_suffix:
+                return method
+        return None
+
+    @staticmethod
+    def compress_file(tar_path: str | Path, method: str = "gzip", level: int | None = None,
+                      block_size: int | None = None, workers: int | None = None,
+                      keep_source: bool = False) -> Path:
+        tar_path = Path(tar_path)
+        if block_size is None:
+            block_size = Compressor.BLOCK_SIZE
+        if block_size <= 0:
+            raise ValueError(f"Block size must be positive: {block_size}")
+        if level is None:
+            level = 6 if method == "gzip" else 3
+        compress = Compressor.__compress_block(method, level)
+        archive_path = tar_path.with_name(tar_path.name + Compressor.SUFFIXES[method])
+        index_path = archive_path.with_name(archive_path.name + ".idx")
+        # 先写到临时文件名, 完成后再改名, 中途失败不会留下不完整的归档
+        partial_archive = archive_path.with_name(archive_path.name + ".partial")
+        partial_index = index_path.with_name(index_path.name + ".partial")
+
+        try:
+            blocks = []
+            offset = 0
+            with partial_archive.open("wb") as out:
+                for data, raw_length in Compressor.__map_ordered(compress, Compressor.__read_blocks(tar_path, block_size), workers):
+                    out.write(data)
+                    blocks.append({"offset": offset, "length": len(data), "raw_length": raw_length})
+                    offset += len(data)
+
+            index = {"method": method, "block_size": block_size, "blocks": blocks}
+            partial_index.write_text(json.dumps(index, indent=2), encoding="utf-8")
+            os.replace(partial_archive, archive_path)
+            os.replace(partial_index, index_path)
+        except BaseException:
+            partial_archive.unlink(missing_ok=True)
+            partial_index.unlink(missing_ok=True)
+            raise
+
+        if not keep_source:
+            tar_path.unlink()
+        return archive_path
+
+    @staticmethod
+    def iter_decompressed(archive_path: str | Path, workers: int | None = None):
+        archive_path = Path(archive_path)
+        method = Compressor.method_of(archive_path)
+        if method is None:
+            raise ValueError(f"Unknown archive type: {archive_path.name}")
+        index_path = archive_path.with_name(archive_path.name + ".idx")
+
+        if index_path.exists():
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+
+            def read_block(block: dict) -> bytes:
+                with archive_path.open("rb") as f:
+                    f.seek(block["offset"])
+                    data = Compressor.__decompress_block(method, f.read(block["length"]))
+                if len(data) != block["raw_length"]:
+                    raise ValueError(f"Block at offset {block['offset']} of {archive_path.name} is corrupted")
+                return data
+
+            yield from Compressor.__map_ordered(read_block, index["blocks"], workers)
+        else:
+            # 没有块索引时只能顺序解压
+            if method == "gzip":
+                reader = gzip.open(archive_path, "rb")
+            elif zstandard is not None:
+                reader = zstandard.ZstdDecompressor().stream_reader(archive_path.open("rb"), closefd=True)
+            else:
+                raise RuntimeError("zstd decompression requires the 'zstandard' package")
+            with reader:
+                while data := reader.read(Compressor.BLOCK_SIZE):
+                    yield data
+
+    @staticmethod
+    def open_stream(archive_path: str | Path, workers: int | None = None) -> io.BufferedReader:
+        return io.BufferedReader(ChunkStream(Compressor.iter_decompressed(archive_path, workers)))
+
+    @staticmethod
+    def decompress_file(archive_path: str | Path, output_path: str | Path, workers: int | None = None) -> int:
+        total = 0
+        with Path(output_path).open("wb") as out:
+            for data in Compressor.iter_decompressed(archive_path, workers):
+                out.write(data)
+                total += len(data)
+        return total
+
+
 class CmdHandler(Cmd_interface):
 
     @staticmethod
@@ -136,7 +356,28 @@ class CmdHandler(Cmd_interface):
             return "", str(e)
 
     @staticmethod
-    def get_local_image_info(if_print: bool = True) -> list[tuple]:
+    def __run_with_input(command: str, chunks):
+        # 把数据块写入命令的标准输入; 输出写到临时文件, 避免管道写满后互相等待
+        with tempfile.TemporaryFile() as out_f, tempfile.TemporaryFile() as err_f:
+            process = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE, stdout=out_f, stderr=err_f)
+            try:
+                for data in chunks:
+                    process.stdin.write(data)
+                process.stdin.close()
+            except BrokenPipeError:
+                # 命令提前退出, 错误信息在 stderr 中
+                pass
+            except BaseException:
+                process.kill()
+                process.wait()
+                raise
+            process.wait()
+            out_f.seek(0)
+            err_f.seek(0)
+            return out_f.read().decode(errors="replace").strip(), err_f.read().decode(errors="replace").strip()
+
+    @staticmethod
+    def get_local_image_info(if_print: bool = True, raise_error: bool = False) -> list[tuple]:
         try:
             if platform.system() == "Windows":
                 out, err = CmdHandler.__run("docker images")
@@ -144,10 +385,14 @@ class CmdHandler(Cmd_interface):
                 out, err = CmdHandler.__run("sudo docker images")
             else:
                 print(f"\033[31mUnsupported operating system: {platform.system()}\033[0m")
+                if raise_error:
+                    raise RuntimeError(f"Unsupported operating system: {platform.system()}")
                 return []
 
             if err:
                 print(f"\033[31mError fetching images: {err}\033[0m")
+                if raise_error:
+                    raise RuntimeError(f"Error fetching images: {err}")
                 return []
 
             info_lst: list = []
@@ -168,6 +413,8 @@ class CmdHandler(Cmd_interface):
         
         except Exception as e:
             print(f"\033[31mError processing image info: {e}\033[0m")
+            if raise_error:
+                raise
             return []
 
     @staticmethod
@@ -183,7 +430,7 @@ class CmdHandler(Cmd_interface):
             print(f"\033[31mError updating database: {e}\033[0m")
 
     @staticmethod
-    def get_db_image_info(is_print: bool = True) -> list[tuple]:
+    def get_db_image_info(is_print: bool = True, raise_error: bool = False) -> list[tuple]:
         try:
             Database.init_connection()
             
@@ -201,6 +448,8 @@ class CmdHandler(Cmd_interface):
 
         except Exception as e:
             print(f"\033[31mError fetching images from database: {e}\033[0m")
+            if raise_error:
+                raise
             return []
 
     @staticmethod
@@ -252,11 +501,13 @@ class CmdHandler(Cmd_interface):
                     return
                     
                 print(f"\033[34mPulling {repo}:{tag}...\033[0m")
+                start = time.monotonic()
                 out, err = CmdHandler.__run(cmd)
                 
                 if err:
                     print(f"\033[31mError pulling {repo}:{tag}: {err}\033[0m")
                 else:
+                    CmdHandler.record_throughput("pull", CmdHandler.parse_size(item[3]), time.monotonic() - start)
                     print(f"\033[32mSuccessfully pulled {repo}:{tag}\033[0m")
                     
             Database.close_connection()
@@ -280,8 +531,13 @@ class CmdHandler(Cmd_interface):
             print(f"\033[31mError export images file: {e}\033[0m")
 
     @staticmethod
-    def export_local_image_tar(output_dir: str = "./exports"):
+    def export_local_image_tar(output_dir: str = "./exports", compress: str | None = None,
+                               workers: int | None = None, block_size: int | None = None):
         try:
+            if compress:
+                # 在第一次 docker save 之前确认压缩方式可用
+                Compressor.check_method(compress)
+
             # Ensure export directory exists
             export_path = Path(output_dir)
             export_path.mkdir(parents=True, exist_ok=True)
@@ -312,6 +568,7 @@ class CmdHandler(Cmd_interface):
                     return
                 
                 # 执行导出命令
+                start = time.monotonic()
                 out, err = CmdHandler.__run(command)
                 
                 if err:
@@ -321,6 +578,19 @@ class CmdHandler(Cmd_interface):
                     if output_file.exists():
                         file_size = output_file.stat().st_size
                         file_size_mb = file_size / (1024 * 1024)
+                        written = file_size
+                        operation = "export"
+                        if compress:
+                            try:
+                                output_file = Compressor.compress_file(output_file, compress, block_size=block_size, workers=workers)
+                                written = output_file.stat().st_size
+                                file_size_mb = written / (1024 * 1024)
+                                operation = f"export+{compress}"
+                            except Compressor.ERRORS as e:
+                                # 压缩失败时保留未压缩的 tar 文件
+                                print(f"\033[31m✗ Error compressing {output_file.name}: {e}\033[0m")
+                        CmdHandler.__remove_stale_archives(output_file)
+                        CmdHandler.record_throughput(operation, file_size, time.monotonic() - start, written=written)
                         print(f"\033[32m✓ Exported {repo}:{tag} to: {output_file} ({file_size_mb:.1f} MB)\033[0m")
                     else:
                         print(f"\033[31m✗ Failed to create {output_file}\033[0m")
@@ -331,5 +601,289 @@ class CmdHandler(Cmd_interface):
             print(f"\033[31mError exporting images: {e}\033[0m")
 
 
-if __name__ == "__main__": 
-    pass
\ No newline at end of file
+
+    @staticmethod
+    def import_local_image_tar(input_dir: str = "./exports", workers: int | None = None):
+        try:
+            tar_files = CmdHandler.list_archive_files(input_dir)
+            if not tar_files:
+                print("\033[33mNo tar files found to import.\033[0m")
+                return
+
+            print(f"\033[36mFound {len(tar_files)} tar files to import...\033[0m")
+
+            for i, tar_file in enumerate(tar_files, 1):
+                if platform.system() not in ("Windows", "Linux"):
+                    print(f"\033[31mUnsupported operating system: {platform.system()}\033[0m")
+                    return
+
+                print(f"\033[34m[{i}/{len(tar_files)}] Importing {tar_file.name}...\033[0m")
+                start = time.monotonic()
+                docker = "docker" if platform.system() == "Windows" else "sudo docker"
+                if Compressor.method_of(tar_file):
+                    # 利用块索引并行解压, 直接通过标准输入交给 docker load
+                    try:
+                        out, err = CmdHandler.__run_with_input(f"{docker} load",
+                                                               Compressor.iter_decompressed(tar_file, workers))
+                    except Compressor.ERRORS as e:
+                        out, err = "", str(e)
+                else:
+                    out, err = CmdHandler.__run(f'{docker} load -i "{tar_file}"')
+
+                if err:
+                    print(f"\033[31m✗ Error importing {tar_file.name}: {err}\033[0m")
+                else:
+                    CmdHandler.record_throughput(CmdHandler.history_key("import", tar_file), tar_file.stat().st_size,
+                                                 time.monotonic() - start)
+                    print(f"\033[32m✓ {out}\033[0m")
+
+            print("\033[32mImport completed!\033[0m")
+
+        except Exception as e:
+            print(f"\033[31mError importing images: {e}\033[0m")
+
+    @staticmethod
+    def verify_local_image_tar(input_dir: str = "./exports", workers: int | None = None) -> bool:
+        try:
+            tar_files = CmdHandler.list_archive_files(input_dir)
+            if not tar_files:
+                print("\033[33mNo tar files found to verify.\033[0m")
+                return True
+
+            all_ok = True
+            for tar_file in tar_files:
+                start = time.monotonic()
+                try:
+                    if Compressor.method_of(tar_file):
+                        # 流式解压并读取 tar 成员, 不把解压后的数据写到磁盘
+                        with Compressor.open_stream(tar_file, workers) as stream:
+                            ok = CmdHandler.__is_image_tar(stream)
+                    else:
+                        with tar_file.open("rb") as f:
+                            ok = CmdHandler.__is_image_tar(f)
+                except Compressor.ERRORS as e:
+                    print(f"\033[31m{tar_file.name}: {e}\033[0m")
+                    ok = False
+
+                if ok:
+                    CmdHandler.record_throughput(CmdHandler.history_key("verify", tar_file), tar_file.stat().st_size,
+                                                 time.monotonic() - start)
+                    print(f"\033[32m✓ {tar_file.name}\033[0m")
+                else:
+                    all_ok = False
+                    print(f"\033[31m✗ {tar_file.name} is not a valid image archive\033[0m")
+
+            return all_ok
+
+        except Exception as e:
+            print(f"\033[31mError verifying images: {e}\033[0m")
+            return False
+
+    @staticmethod
+    def __is_image_tar(fileobj) -> bool:
+        # 读取全部成员以检查归档是否完整
+        with tarfile.open(fileobj=fileobj, mode="r|") as tf:
+            names = [member.name for member in tf]
+        return "manifest.json" in names
+
+    @staticmethod
+    def __remove_stale_archives(output_file: Path):
+        # 删除同一镜像之前导出的其他格式, 避免 import 和 verify 处理两份
+        tar_name = output_file.name
+        if Compressor.method_of(output_file):
+            tar_name = output_file.stem
+        candidates = [tar_name] + [tar_name + suffix for suffix in Compressor.SUFFIXES.values()]
+        for name in candidates:
+            if name != output_file.name:
+                (output_file.parent / name).unlink(missing_ok=True)
+                (output_file.parent / (name + ".idx")).unlink(missing_ok=True)
+
+    @staticmethod
+    def list_archive_files(directory: str) -> list[Path]:
+        patterns = ["*.tar"] + [f"*.tar{suffix}" for suffix in Compressor.SUFFIXES.values()]
+        return sorted(f for pattern in patterns for f in Path(directory).glob(pattern))
+
+    @staticmethod
+    def parse_size(size: str) -> int:
+        # docker images 使用十进制单位, 如 "12.8MB", "512kB", "1.2GB"
+        units = {"B": 1, "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4}
+        try:
+            s = size.strip().upper()
+            for unit in ("TB", "GB", "MB", "KB", "B"):
+                if s.endswith(unit):
+                    return int(float(s[:-len(unit)]) * units[unit])
+            return int(float(s))
+        except (ValueError, AttributeError):
+            return 0
+
+    @staticmethod
+    def record_throughput(operation: str, nbytes: int, seconds: float, history_file: str | None = None,
+                          written: int | None = None):
+        try:
+            p = Path(history_file) if history_file else Path(__file__).parent / "throughput.json"
+            history = json.loads(p.read_text(encoding="utf-8")) if p.exists() else {}
+            records = history.setdefault(operation, [])
+            record = {"bytes": nbytes, "seconds": round(seconds, 3)}
+            if written is not None:
+                record["written"] = written
+            records.append(record)
+            # 只保留最近的记录, 让估算跟随当前网络和磁盘状况
+            history[operation] = records[-50:]
+            p.write_text(json.dumps(history, indent=2), encoding="utf-8")
+        except Exception as e:
+            print(f"\033[33mCould not record throughput: {e}\033[0m")
+
+    @staticmethod
+    def estimate_duration(operation: str, nbytes: int, history_file: str | None = None) -> float | None:
+        try:
+            p = Path(history_file) if history_file else Path(__file__).parent / "throughput.json"
+            if not p.exists():
+                return None
+            records = json.loads(p.read_text(encoding="utf-8")).get(operation, [])
+            total_bytes = sum(r["bytes"] for r in records)
+            total_seconds = sum(r["seconds"] for r in records)
+            if total_bytes <= 0 or total_seconds <= 0:
+                return None
+            return nbytes / (total_bytes / total_seconds)
+        except Exception as e:
+            print(f"\033[33mCould not read throughput history: {e}\033[0m")
+            return None
+
+    @staticmethod
+    def estimate_ratio(operation: str, history_file: str | None = None) -> float | None:
+        # 根据历史记录估算写出的字节数与原始字节数之比 (如压缩率)
+        try:
+            p = Path(history_file) if history_file else Path(__file__).parent / "throughput.json"
+            if not p.exists():
+                return None
+            records = [r for r in json.loads(p.read_text(encoding="utf-8")).get(operation, []) if "written" in r]
+            total_bytes = sum(r["bytes"] for r in records)
+            if total_bytes <= 0:
+                return None
+            return sum(r["written"] for r in records) / total_bytes
+        except Exception as e:
+            print(f"\033[33mCould not read throughput history: {e}\033[0m")
+            return None
+
+    @staticmethod
+    def history_key(operation: str, path: Path) -> str:
+        # 不同格式的归档读写速度不同, 分别记录吞吐量, 如 "import" 和 "import+gzip"
+        method = Compressor.method_of(path)
+        return f"{operation}+{method}" if method else operation
+
+    @staticmethod
+    def plan(operation: str, inventory: str | None = None, directory: str = "./exports",
+             history_file: str | None = None, compress: str | None = None, is_print: bool = True) -> dict:
+        # 只读取缓存的清单和数据库目录, 不会改动 Docker 的存储
+        try:
+            # 压缩导出的耗时和写出量与普通导出分开记录
+            plan_key = f"export+{compress}" if operation == "export" and compress else operation
+            if operation in ("sync", "pull", "export"):
+                inventory_file = Path(inventory) if inventory else Path(__file__).parent / "images.json"
+                if inventory_file.exists():
+                    local_images = CmdHandler.get_file_image_info(str(inventory_file), is_print=False)
+                    if local_images is None:
+                        raise ValueError(f"Could not read inventory {inventory_file}")
+                else:
+                    local_images = CmdHandler.get_local_image_info(if_print=False, raise_error=True)
+
+            keys = None
+            if operation == "sync":
+                items = [(f"{repo}:{tag}", 0) for repo, tag, _, _ in local_images]
+            elif operation == "pull":
+                local_image_set = {(item[0], item[1]) for item in local_images}
+                items = [(f"{repo}:{tag}", CmdHandler.parse_size(size))
+                         for repo, tag, _, size in CmdHandler.get_db_image_info(is_print=False, raise_error=True)
+                         if (repo, tag) not in local_image_set]
+            elif operation == "export":
+                items = [(f"{repo}:{tag}", CmdHandler.parse_size(size)) for repo, tag, _, size in local_images]
+            elif operation in ("import", "verify"):
+                files = CmdHandler.list_archive_files(directory)
+                items = [(f.name, f.stat().st_size) for f in files]
+                keys = [CmdHandler.history_key(operation, f) for f in files]
+            else:
+                raise ValueError(f"Unknown operation: {operation}")
+
+            # 按历史记录的键分组估算耗时, 任何一组没有历史时总耗时未知
+            bytes_by_key: dict[str, int] = {}
+            for i, (_, nbytes) in enumerate(items):
+                key = keys[i] if keys else plan_key
+                bytes_by_key[key] = bytes_by_key.get(key, 0) + nbytes
+            total_bytes = sum(bytes_by_key.values())
+            seconds = 0.0
+            for key, nbytes in bytes_by_key.items():
+                if nbytes and seconds is not None:
+                    estimate = CmdHandler.estimate_duration(key, nbytes, history_file)
+                    seconds = None if estimate is None else seconds + estimate
+            if plan_key != operation:
+                ratio = CmdHandler.estimate_ratio(plan_key, history_file)
+                written = None if ratio is None else int(total_bytes * ratio)
+            else:
+                written = total_bytes
+            result = {"operation": plan_key, "items": items, "count": len(items),
+                      "bytes": total_bytes, "written": written, "seconds": seconds, "ok": True}
+
+            if is_print:
+                for name, nbytes in items:
+                    print(f"\033[36m  {name} ({nbytes / (1024 * 1024):.1f} MB)\033[0m")
+                duration = "unknown (no throughput history)" if seconds is None else f"{seconds:.0f}s"
+                size = f"{total_bytes / (1024 * 1024):.1f} MB"
+                if plan_key != operation:
+                    size += ", written unknown" if written is None else f", ~{written / (1024 * 1024):.1f} MB written"
+                print(f"\033[34mPlan [{plan_key}]: {len(items)} images, {size}, estimated duration {duration}\033[0m")
+
+            return result
+
+        except Exception as e:
+            print(f"\033[31mError building plan: {e}\033[0m")
+            return {"operation": operation, "items": [], "count": 0, "bytes": 0, "written": None,
+                    "seconds": None, "ok": False}
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return number
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="saveImage", description="Synchronize, pull, export and import Docker images")
+    parser.add_argument("command", choices=["sync", "pull", "export", "import", "verify"])
+    parser.add_argument("--plan", action="store_true", help="show the work list and estimated cost without running it")
+    parser.add_argument("--dir", default="./exports", help="directory of exported tar files")
+    parser.add_argument("--inventory", default=None, help="cached images.json used by --plan")
+    parser.add_argument("--compress", choices=sorted(Compressor.SUFFIXES), default=None, help="compress exported tar files")
+    parser.add_argument("--workers", type=positive_int, default=None,
+                        help="compression threads (default: CPU count, at most 8); "
+                             "peak memory is about 2 * workers * block size")
+    parser.add_argument("--block-size", type=positive_int, default=64, help="compression block size in MB")
+    args = parser.parse_args(argv)
+
+    if args.compress:
+        try:
+            Compressor.check_method(args.compress)
+        except (ValueError, RuntimeError) as e:
+            parser.error(str(e))
+
+    if args.plan:
+        result = CmdHandler.plan(args.command, inventory=args.inventory, directory=args.dir, compress=args.compress)
+        return 0 if result["ok"] else 1
+
+    if args.command == "sync":
+        CmdHandler.update_info_to_db()
+    elif args.command == "pull":
+        CmdHandler.pull_images_from_database()
+    elif args.command == "export":
+        CmdHandler.export_local_image_file()
+        CmdHandler.export_local_image_tar(args.dir, compress=args.compress, workers=args.workers,
+                                          block_size=args.block_size * 1024 * 1024)
+    elif args.command == "import":
+        CmdHandler.import_local_image_tar(args.dir, workers=args.workers)
+    elif args.command == "verify":
+        return 0 if CmdHandler.verify_local_image_tar(args.dir, workers=args.workers) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,9 +2,17 @@ import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import sys
 import os
+import json
+import tempfile
+import gzip
+import io
+import tarfile
+import time
+import zlib
+from pathlib import Path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
-from saveImage import CmdHandler, Database
+from saveImage import CmdHandler, Compressor, Database, main, zstandard
 
 
 class TestDatabase(unittest.TestCase):
@@ -264,12 +272,13 @@ alpine       latest    4bcff63911fc   4 weeks ago   12.8MB""", "")
         
         self.assertIsNone(result)
 
+    @patch('saveImage.CmdHandler.record_throughput')
     @patch('saveImage.Database')
     @patch('saveImage.CmdHandler.get_db_image_info')
     @patch('saveImage.CmdHandler.get_local_image_info')
     @patch('saveImage.platform.system')
     @patch('saveImage.CmdHandler._CmdHandler__run')
-    def test_pull_images_from_database_windows(self, mock_run, mock_platform, mock_local, mock_db, mock_database):
+    def test_pull_images_from_database_windows(self, mock_run, mock_platform, mock_local, mock_db, mock_database, mock_record):
         # 测试在Windows系统从数据库拉取镜像
         mock_platform.return_value = "Windows"
         mock_db.return_value = [('alpine', 'latest', 'abc123', '12.8MB')]
@@ -280,10 +289,11 @@ alpine       latest    4bcff63911fc   4 weeks ago   12.8MB""", "")
         
         mock_run.assert_called_with("docker pull alpine:latest")
 
+    @patch('saveImage.CmdHandler.record_throughput')
     @patch('saveImage.Database')
     @patch('saveImage.CmdHandler.get_db_image_info')
     @patch('saveImage.CmdHandler.get_local_image_info')
-    def test_pull_images_from_database_image_exists(self, mock_local, mock_db, mock_database):
+    def test_pull_images_from_database_image_exists(self, mock_local, mock_db, mock_database, mock_record):
         # 测试镜像已存在本地的情况
         mock_db.return_value = [('alpine', 'latest', 'abc123', '12.8MB')]
         mock_local.return_value = [('alpine', 'latest', 'abc123', '12.8MB')]  # 本地已有镜像
@@ -333,6 +343,369 @@ alpine       latest    4bcff63911fc   4 weeks ago   12.8MB""", "")
         
         # 应该不会抛出异常，只是打印警告
 
+    def test_parse_size(self):
+        # 测试解析docker镜像大小
+        self.assertEqual(CmdHandler.parse_size("12.8MB"), 12800000)
+        self.assertEqual(CmdHandler.parse_size("512kB"), 512000)
+        self.assertEqual(CmdHandler.parse_size("1.2GB"), 1200000000)
+        self.assertEqual(CmdHandler.parse_size("unknown"), 0)
+
+    def test_estimate_duration_from_history(self):
+        # 测试根据吞吐量历史估算时间
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, "throughput.json")
+            self.assertIsNone(CmdHandler.estimate_duration("pull", 1000, history))
+
+            CmdHandler.record_throughput("pull", 1000, 1.0, history)
+            CmdHandler.record_throughput("pull", 3000, 1.0, history)
+
+            self.assertEqual(CmdHandler.estimate_duration("pull", 4000, history), 2.0)
+            self.assertIsNone(CmdHandler.estimate_duration("export", 4000, history))
+
+    @patch('saveImage.CmdHandler.get_db_image_info')
+    @patch('saveImage.CmdHandler.get_local_image_info')
+    def test_plan_pull_from_inventory(self, mock_local, mock_db):
+        # 测试pull计划只使用缓存清单, 不访问docker
+        mock_db.return_value = [('alpine', 'latest', 'abc123', '12.8MB'),
+                                ('debian', '12', 'def456', '181MB')]
+        with tempfile.TemporaryDirectory() as tmp:
+            inventory = os.path.join(tmp, "images.json")
+            with open(inventory, "w", encoding="utf-8") as f:
+                json.dump([{"repo": "alpine", "tag": "latest", "hash": "abc123", "size": "12.8MB"}], f)
+
+            result = CmdHandler.plan("pull", inventory=inventory,
+                                     history_file=os.path.join(tmp, "throughput.json"), is_print=False)
+
+        self.assertEqual(result["items"], [("debian:12", 181000000)])
+        self.assertEqual(result["bytes"], 181000000)
+        self.assertIsNone(result["seconds"])
+        self.assertTrue(result["ok"])
+        mock_local.assert_not_called()
+
+    @patch('saveImage.Database')
+    def test_plan_pull_database_unreachable(self, mock_database):
+        # 测试数据库不可用时计划失败, 而不是报告0个镜像
+        mock_database.init_connection.side_effect = Exception("Database error")
+
+        result = CmdHandler.plan("pull", inventory="missing-images.json", is_print=False)
+
+        self.assertFalse(result["ok"])
+        self.assertIsNone(result["seconds"])
+
+    @patch('saveImage.CmdHandler.get_local_image_info')
+    def test_plan_export_without_inventory(self, mock_local):
+        # 测试没有缓存清单时export计划读取本地镜像列表
+        mock_local.return_value = [('alpine', 'latest', 'abc123', '12.8MB')]
+
+        result = CmdHandler.plan("export", inventory="missing-images.json", is_print=False)
+
+        self.assertEqual(result["count"], 1)
+        self.assertEqual(result["bytes"], 12800000)
+
+    @patch('saveImage.CmdHandler._CmdHandler__run')
+    def test_plan_export_docker_unreachable(self, mock_run):
+        # 测试没有缓存清单且docker不可用时计划失败
+        mock_run.return_value = ("", "Cannot connect to the Docker daemon")
+
+        result = CmdHandler.plan("export", inventory="missing-images.json", is_print=False)
+
+        self.assertFalse(result["ok"])
+
+    @patch('saveImage.CmdHandler.get_local_image_info')
+    def test_plan_export_compressed(self, mock_local):
+        # 测试压缩导出的计划使用对应的吞吐量历史估算写出量和耗时
+        mock_local.return_value = [('alpine', 'latest', 'abc123', '100MB')]
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, "throughput.json")
+            CmdHandler.record_throughput("export", 1000, 1.0, history, written=1000)
+            CmdHandler.record_throughput("export+gzip", 1000, 4.0, history, written=250)
+
+            result = CmdHandler.plan("export", inventory="missing-images.json", history_file=history,
+                                     compress="gzip", is_print=False)
+
+        self.assertEqual(result["operation"], "export+gzip")
+        self.assertEqual(result["bytes"], 100000000)
+        self.assertEqual(result["written"], 25000000)
+        self.assertEqual(result["seconds"], 400000.0)
+
+    def test_plan_import_history_per_format(self):
+        # 测试计划按文件格式选择对应的吞吐量历史
+        with tempfile.TemporaryDirectory() as tmp:
+            history = os.path.join(tmp, "throughput.json")
+            with open(os.path.join(tmp, "alpine_latest.tar"), "wb") as f:
+                f.write(b"x" * 1000)
+            with open(os.path.join(tmp, "debian_12.tar.gz"), "wb") as f:
+                f.write(b"x" * 500)
+            CmdHandler.record_throughput("import", 1000, 1.0, history)
+            CmdHandler.record_throughput("import+gzip", 1000, 10.0, history)
+
+            result = CmdHandler.plan("import", directory=tmp, history_file=history, is_print=False)
+
+        self.assertEqual(CmdHandler.history_key("import", "a.tar"), "import")
+        self.assertEqual(CmdHandler.history_key("import", "a.tar.gz"), "import+gzip")
+        self.assertEqual(CmdHandler.history_key("verify", "a.tar.zst"), "verify+zstd")
+        self.assertEqual(result["seconds"], 6.0)
+
+    @patch('saveImage.platform.system')
+    @patch('saveImage.CmdHandler._CmdHandler__run')
+    def test_import_local_image_tar_linux(self, mock_run, mock_platform):
+        # 测试在Linux系统导入tar文件
+        mock_platform.return_value = "Linux"
+        mock_run.return_value = ("Loaded image: alpine:latest", "")
+        with tempfile.TemporaryDirectory() as tmp:
+            tar_file = os.path.join(tmp, "alpine_latest.tar")
+            open(tar_file, "wb").close()
+
+            with patch('saveImage.CmdHandler.record_throughput'):
+                CmdHandler.import_local_image_tar(tmp)
+
+        mock_run.assert_called_once_with(f'sudo docker load -i "{tar_file}"')
+
+    def test_verify_local_image_tar_invalid(self):
+        # 测试校验损坏的tar文件
+        with tempfile.TemporaryDirectory() as tmp:
+            with open(os.path.join(tmp, "broken.tar"), "wb") as f:
+                f.write(b"not a tar file")
+
+            self.assertFalse(CmdHandler.verify_local_image_tar(tmp))
+
+
+class TestMain(unittest.TestCase):
+
+    @patch('saveImage.CmdHandler.plan')
+    @patch('saveImage.CmdHandler.pull_images_from_database')
+    def test_main_plan_does_not_run(self, mock_pull, mock_plan):
+        # 测试--plan只生成计划不执行
+        mock_plan.return_value = {"ok": True}
+        self.assertEqual(main(["export", "--plan", "--compress", "gzip"]), 0)
+
+        mock_plan.assert_called_once_with("export", inventory=None, directory="./exports", compress="gzip")
+        mock_pull.assert_not_called()
+
+    @patch('saveImage.CmdHandler.plan')
+    def test_main_plan_failure_exit_code(self, mock_plan):
+        # 测试计划失败时返回非零退出码
+        mock_plan.return_value = {"ok": False}
+
+        self.assertEqual(main(["pull", "--plan"]), 1)
+
+    @patch('saveImage.CmdHandler.export_local_image_tar')
+    @patch('saveImage.CmdHandler.export_local_image_file')
+    def test_main_export(self, mock_file, mock_tar):
+        # 测试export命令
+        main(["export", "--dir", "./out", "--compress", "gzip", "--workers", "4", "--block-size", "8"])
+
+        mock_file.assert_called_once()
+        mock_tar.assert_called_once_with("./out", compress="gzip", workers=4, block_size=8 * 1024 * 1024)
+
+
+class TestCompressor(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        # 生成一个包含 manifest.json 的镜像tar文件
+        self.tar_path = os.path.join(self.dir, "alpine_latest.tar")
+        with tarfile.open(self.tar_path, "w") as tf:
+            for name, data in (("manifest.json", b"[]"), ("layer.tar", os.urandom(50000) + b"x" * 50000)):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+        with open(self.tar_path, "rb") as f:
+            self.raw = f.read()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_compress_gzip_multi_member(self):
+        # 测试gzip分块压缩后仍是标准gzip文件, 并写出块索引
+        archive = Compressor.compress_file(self.tar_path, "gzip", block_size=16384, workers=4)
+
+        self.assertEqual(archive.name, "alpine_latest.tar.gz")
+        self.assertFalse(os.path.exists(self.tar_path))
+        with open(archive, "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), self.raw)
+
+        with open(str(archive) + ".idx", encoding="utf-8") as f:
+            index = json.load(f)
+        self.assertEqual(index["method"], "gzip")
+        self.assertEqual(len(index["blocks"]), -(-len(self.raw) // 16384))
+        self.assertEqual(sum(b["raw_length"] for b in index["blocks"]), len(self.raw))
+
+    def test_decompress_with_and_without_index(self):
+        # 测试使用块索引并行解压, 以及没有索引时顺序解压
+        archive = Compressor.compress_file(self.tar_path, "gzip", block_size=16384, workers=4)
+        output = os.path.join(self.dir, "out.tar")
+
+        self.assertEqual(Compressor.decompress_file(archive, output, workers=4), len(self.raw))
+        with open(output, "rb") as f:
+            self.assertEqual(f.read(), self.raw)
+
+        os.remove(str(archive) + ".idx")
+        self.assertEqual(Compressor.decompress_file(archive, output), len(self.raw))
+
+    @unittest.skipIf(zstandard is None, "zstandard is not installed")
+    def test_compress_zstd_round_trip(self):
+        # 测试zstd多帧压缩
+        archive = Compressor.compress_file(self.tar_path, "zstd", block_size=16384, workers=4)
+        output = os.path.join(self.dir, "out.tar")
+
+        self.assertEqual(archive.name, "alpine_latest.tar.zst")
+        Compressor.decompress_file(archive, output, workers=4)
+        with open(output, "rb") as f:
+            self.assertEqual(f.read(), self.raw)
+
+    def test_verify_compressed_archive(self):
+        # 测试校验压缩后的tar文件, 以及损坏的块
+        archive = Compressor.compress_file(self.tar_path, "gzip", block_size=16384)
+
+        with patch('saveImage.CmdHandler.record_throughput'):
+            self.assertTrue(CmdHandler.verify_local_image_tar(self.dir))
+
+            with open(archive, "r+b") as f:
+                f.seek(20000)
+                f.write(b"corrupted")
+            self.assertFalse(CmdHandler.verify_local_image_tar(self.dir))
+
+    @patch('saveImage.platform.system')
+    @patch('saveImage.CmdHandler._CmdHandler__run_with_input')
+    def test_import_compressed_archive(self, mock_run_with_input, mock_platform):
+        # 测试导入压缩文件时并行解压并通过标准输入交给docker load, 不写临时文件
+        mock_platform.return_value = "Linux"
+        loaded = []
+        mock_run_with_input.side_effect = lambda command, chunks: (loaded.append(b"".join(chunks)), ("Loaded image: alpine:latest", ""))[1]
+        Compressor.compress_file(self.tar_path, "gzip", block_size=16384)
+
+        with patch('saveImage.CmdHandler.record_throughput'):
+            CmdHandler.import_local_image_tar(self.dir)
+
+        self.assertEqual(mock_run_with_input.call_args[0][0], "sudo docker load")
+        self.assertEqual(loaded, [self.raw])
+        self.assertEqual(sorted(os.listdir(self.dir)), ["alpine_latest.tar.gz", "alpine_latest.tar.gz.idx"])
+
+    @patch('saveImage.platform.system')
+    @patch('saveImage.CmdHandler._CmdHandler__run')
+    @patch('saveImage.CmdHandler._CmdHandler__run_with_input')
+    def test_import_continues_after_corrupted_archive(self, mock_run_with_input, mock_run, mock_platform):
+        # 测试一个损坏的压缩文件不会中断后续文件的导入
+        mock_platform.return_value = "Linux"
+        mock_run_with_input.side_effect = lambda command, chunks: (b"".join(chunks), ("", ""))[1]
+        mock_run.return_value = ("Loaded image: b:latest", "")
+        archive = Compressor.compress_file(self.tar_path, "gzip", block_size=16384, keep_source=True)
+        archive = archive.rename(os.path.join(self.dir, "a.tar.gz"))
+        os.rename(self.tar_path + ".gz.idx", str(archive) + ".idx")
+        os.rename(self.tar_path, os.path.join(self.dir, "b.tar"))
+        with open(archive, "r+b") as f:
+            f.seek(20000)
+            f.write(b"corrupted")
+
+        with patch('saveImage.CmdHandler.record_throughput') as mock_record:
+            CmdHandler.import_local_image_tar(self.dir)
+
+        mock_run.assert_called_once_with(f'sudo docker load -i "{os.path.join(self.dir, "b.tar")}"')
+        self.assertEqual([c[0][0] for c in mock_record.call_args_list], ["import"])
+        self.assertEqual(sorted(os.listdir(self.dir)), ["a.tar.gz", "a.tar.gz.idx", "b.tar"])
+
+    def test_verify_continues_after_truncated_archive(self):
+        # 测试没有索引的截断文件只让该文件校验失败, 后续文件仍被校验
+        with open(self.tar_path, "rb") as f:
+            data = gzip.compress(f.read())
+        with open(os.path.join(self.dir, "a.tar.gz"), "wb") as f:
+            f.write(data[:len(data) // 2])
+        os.rename(self.tar_path, os.path.join(self.dir, "z.tar"))
+
+        with patch('saveImage.CmdHandler.record_throughput') as mock_record:
+            self.assertFalse(CmdHandler.verify_local_image_tar(self.dir))
+
+        mock_record.assert_called_once()
+        self.assertEqual(mock_record.call_args[0][0], "verify")
+
+    def test_compress_rejects_invalid_block_size(self):
+        # 测试非正数的块大小
+        for block_size in (0, -1):
+            with self.assertRaises(ValueError):
+                Compressor.compress_file(self.tar_path, "gzip", block_size=block_size)
+
+    def test_main_rejects_invalid_block_size(self):
+        # 测试命令行拒绝非正数的块大小和线程数
+        for argv in (["export", "--block-size", "0"], ["export", "--block-size", "-8"], ["export", "--workers", "0"]):
+            with patch('sys.stderr', new_callable=io.StringIO), self.assertRaises(SystemExit):
+                main(argv)
+
+    @patch('saveImage.Path')
+    @patch('saveImage.Compressor.compress_file')
+    @patch('saveImage.CmdHandler.record_throughput')
+    @patch('saveImage.CmdHandler.get_local_image_info')
+    @patch('saveImage.platform.system')
+    @patch('saveImage.CmdHandler._CmdHandler__run')
+    def test_export_compressed_throughput_key(self, mock_run, mock_platform, mock_get_images,
+                                              mock_record, mock_compress, mock_path):
+        # 测试压缩导出的吞吐量单独记录
+        mock_platform.return_value = "Linux"
+        mock_get_images.return_value = [('alpine', 'latest', 'abc123', '12.8MB')]
+        mock_run.return_value = ("", "")
+
+        CmdHandler.export_local_image_tar("./test_exports", compress="gzip")
+
+        self.assertEqual(mock_record.call_args[0][0], "export+gzip")
+
+    def test_verify_large_blocks(self):
+        # 测试几MB的块也能以接近磁盘的速度流式校验
+        tar_path = os.path.join(self.dir, "large.tar")
+        with tarfile.open(tar_path, "w") as tf:
+            for name, data in (("manifest.json", b"[]"), ("layer.tar", bytes(48 * 1024 * 1024))):
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+        os.remove(self.tar_path)
+
+        start = time.monotonic()
+        Compressor.compress_file(tar_path, "gzip", level=1, block_size=16 * 1024 * 1024)
+        compress_seconds = time.monotonic() - start
+
+        start = time.monotonic()
+        with patch('saveImage.CmdHandler.record_throughput'):
+            self.assertTrue(CmdHandler.verify_local_image_tar(self.dir))
+        # 校验不应比压缩慢很多, 逐次复制剩余缓冲区时会慢上百倍
+        self.assertLess(time.monotonic() - start, max(2.0, 5 * compress_seconds))
+
+    @patch('saveImage.zstandard', None)
+    @patch('saveImage.CmdHandler.get_local_image_info')
+    @patch('saveImage.CmdHandler._CmdHandler__run')
+    def test_export_zstd_unavailable(self, mock_run, mock_get_images):
+        # 测试zstandard未安装时在docker save之前就失败
+        mock_get_images.return_value = [('alpine', 'latest', 'abc123', '12.8MB')]
+
+        CmdHandler.export_local_image_tar(self.dir, compress="zstd")
+
+        mock_run.assert_not_called()
+        with patch('saveImage.CmdHandler.export_local_image_tar') as mock_export, \
+                patch('sys.stderr', new_callable=io.StringIO), self.assertRaises(SystemExit) as cm:
+            main(["export", "--compress", "zstd"])
+        self.assertNotEqual(cm.exception.code, 0)
+        mock_export.assert_not_called()
+
+    def test_compress_failure_leaves_no_partial_archive(self):
+        # 测试压缩中途失败时删除不完整的输出, 保留原tar文件
+        with patch('saveImage.gzip.compress', side_effect=zlib.error("boom")):
+            with self.assertRaises(zlib.error):
+                Compressor.compress_file(self.tar_path, "gzip", block_size=16384)
+
+        self.assertEqual(os.listdir(self.dir), ["alpine_latest.tar"])
+
+    def test_remove_stale_archives(self):
+        # 测试重新导出时删除同一镜像之前的其他格式
+        remove = CmdHandler._CmdHandler__remove_stale_archives
+        for name in ("alpine_latest.tar.gz", "alpine_latest.tar.gz.idx", "alpine_latest.tar.zst", "other.tar.gz"):
+            open(os.path.join(self.dir, name), "wb").close()
+
+        remove(Path(self.tar_path))
+        self.assertEqual(sorted(os.listdir(self.dir)), ["alpine_latest.tar", "other.tar.gz"])
+
+        archive = Compressor.compress_file(self.tar_path, "gzip", block_size=16384, keep_source=True)
+        remove(archive)
+        self.assertEqual(sorted(os.listdir(self.dir)),
+                         ["alpine_latest.tar.gz", "alpine_latest.tar.gz.idx", "other.tar.gz"])
 
 if __name__ == '__main__':
     # 运行测试时显示详细信息
@@ -350,4 +723,10 @@ if __name__ == '__main__':
 # 从文件获取镜像信息（成功/文件不存在）
 # 从数据库拉取镜像（Windows/镜像已存在）
 # 导出镜像文件（成功）
-# 导出tar文件（Windows/无镜像）
\ No newline at end of file
+# 导出tar文件（Windows/无镜像）
+# 导入/校验tar文件
+# 计划与耗时估算（大小解析/吞吐量历史/pull/export）
+# 命令行入口（--plan/export）
+# Compressor类测试：
+# 分块压缩（gzip/zstd）、并行解压（有/无索引）、校验与导入压缩文件
+# 大块流式校验、zstd不可用、压缩失败清理、删除旧格式归档
\ No newline at end of file